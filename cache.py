@@ -0,0 +1,43 @@
+import os
+import hashlib
+import json
+
+from dotenv import load_dotenv
+
+from redis.asyncio import ConnectionPool, Redis
+
+load_dotenv()
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = os.getenv("REDIS_PORT", "6379")
+REDIS_DB = os.getenv("REDIS_DB", "0")
+
+REDIS_DSN = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+
+AD_CACHE_TTL = 300
+SEARCH_CACHE_TTL = 60
+SEARCH_VERSION_KEY = "ads:ver"
+
+pool = ConnectionPool.from_url(REDIS_DSN)
+redis = Redis(connection_pool=pool)
+
+def ad_key(advertisement_id) -> str:
+    return f"ad:{advertisement_id}"
+
+async def search_key(**params) -> str:
+    version = await redis.get(SEARCH_VERSION_KEY)
+    version = version.decode() if version is not None else "0"
+    digest = hashlib.sha1(
+        json.dumps(params, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f"ads:search:{version}:{digest}"
+
+async def invalidate_search():
+    await redis.incr(SEARCH_VERSION_KEY)
+
+async def init_cache():
+    await redis.ping()
+
+async def close_cache():
+    await redis.aclose()
+    await pool.aclose()
@@ -1,16 +1,27 @@
+import base64
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 from typing import List, Optional
 from fastapi import FastAPI, HTTPException, Path, Query, Depends
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
 from uuid import UUID, uuid4
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
-from models import AdvertisementORM, AsyncSessionLocal, init_db
-from sqlalchemy import select
+from models import AdvertisementORM, AsyncSessionLocal, init_db, close_db
+from cache import (
+    AD_CACHE_TTL,
+    SEARCH_CACHE_TTL,
+    ad_key,
+    search_key,
+    invalidate_search,
+    redis,
+    init_cache,
+    close_cache,
+)
+from sqlalchemy import select, insert, update, delete, or_, tuple_, literal
 
 
-app = FastAPI(title="Advertisements API")
-
 class AdvertisementCreate(BaseModel):
     title: str = Field(..., example="Продаю велосипед")
     description: str = Field(..., example="Чистый вагон, состояние отличное")
@@ -31,15 +42,30 @@ class Advertisement(BaseModel):
     author: str
     created_at: datetime
 
-def orm_to_pydantic(ad: AdvertisementORM) -> Advertisement:
-    return Advertisement(
-        id=ad.id,
-        title=ad.title,
-        description=ad.description,
-        price=ad.price,
-        author=ad.author,
-        created_at=ad.created_at,
-    )
+def orm_to_dict(ad: AdvertisementORM) -> dict:
+    return {
+        "id": ad.id,
+        "title": ad.title,
+        "description": ad.description,
+        "price": ad.price,
+        "author": ad.author,
+        "created_at": ad.created_at,
+    }
+
+def encode_cursor(ad: AdvertisementORM) -> str:
+    raw = f"{ad.created_at.isoformat()}|{ad.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, ad_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), str(UUID(ad_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def search_response(body: bytes, next_cursor: str) -> Response:
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content=body, media_type="application/json", headers=headers)
 
 async def get_session() :
     async with AsyncSessionLocal() as session:
@@ -48,13 +74,20 @@ async def get_session() :
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await init_cache()
     yield
+    await close_cache()
+    await close_db()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(
+    title="Advertisements API",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 @app.post("/advertisement", response_model=Advertisement, status_code=201)
 async def create_advertisement(ad: AdvertisementCreate, session: AsyncSession = Depends(get_session)):
-    new_id = uuid4()
+    new_id = str(uuid4())
     ad_obj = AdvertisementORM(
         id=new_id,
         title=ad.title,
@@ -65,16 +98,46 @@ async def create_advertisement(ad: AdvertisementCreate, session: AsyncSession =
     )
     session.add(ad_obj)
     await session.commit()
-    await session.refresh(ad_obj)
-    return orm_to_pydantic(ad_obj)
+    await invalidate_search()
+    return ORJSONResponse(content=orm_to_dict(ad_obj), status_code=201)
+
+@app.post("/advertisement/bulk", response_model=List[Advertisement], status_code=201)
+async def create_advertisements_bulk(ads: List[AdvertisementCreate], session: AsyncSession = Depends(get_session)):
+    if not ads:
+        return ORJSONResponse(content=[], status_code=201)
+    created_at = datetime.now(timezone.utc)
+    stmt = insert(AdvertisementORM).returning(AdvertisementORM, sort_by_parameter_order=True)
+    result = await session.scalars(
+        stmt,
+        [
+            {
+                "id": str(uuid4()),
+                "title": ad.title,
+                "description": ad.description,
+                "price": ad.price,
+                "author": ad.author,
+                "created_at": created_at,
+            }
+            for ad in ads
+        ],
+    )
+    ad_objs = result.all()
+    await session.commit()
+    await invalidate_search()
+    return ORJSONResponse(content=[orm_to_dict(a) for a in ad_objs], status_code=201)
 
 @app.get("/advertisement/{advertisement_id}", response_model=Advertisement)
 async def get_advertisement(advertisement_id: UUID = Path(..., description="ID объявления"), session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(AdvertisementORM).where(AdvertisementORM.id == advertisement_id))
-    ad_obj = result.scalar_one_or_none()
+    cached = await redis.get(ad_key(advertisement_id))
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    ad_obj = await session.get(AdvertisementORM, str(advertisement_id))
     if ad_obj is None:
         raise HTTPException(status_code=404, detail="Advertisement not found")
-    return orm_to_pydantic(ad_obj)
+    body = orjson.dumps(orm_to_dict(ad_obj))
+    await redis.set(ad_key(advertisement_id), body, ex=AD_CACHE_TTL)
+    return Response(content=body, media_type="application/json")
 
 @app.patch("/advertisement/{advertisement_id}", response_model=Advertisement)
 async def update_advertisement(
@@ -82,28 +145,38 @@ async def update_advertisement(
     ad_update: AdvertisementUpdate = ...,
     session: AsyncSession = Depends(get_session)
 ):
-    result = await session.execute(select(AdvertisementORM).where(AdvertisementORM.id == advertisement_id))
-    existing = result.scalar_one_or_none()
+    update_data = ad_update.model_dump(exclude_unset=True)
+    if update_data:
+        stmt = (
+            update(AdvertisementORM)
+            .where(AdvertisementORM.id == str(advertisement_id))
+            .values(**update_data)
+            .returning(AdvertisementORM)
+        )
+        existing = (await session.execute(stmt)).scalar_one_or_none()
+    else:
+        existing = await session.get(AdvertisementORM, str(advertisement_id))
     if existing is None:
         raise HTTPException(status_code=404, detail="Advertisement not found")
 
-    update_data = ad_update.dict(exclude_unset=True)
-    for k, v in update_data.items():
-        setattr(existing, k, v)
-
-    session.add(existing)
     await session.commit()
-    await session.refresh(existing)
-    return orm_to_pydantic(existing)
+    await redis.delete(ad_key(advertisement_id))
+    await invalidate_search()
+    return ORJSONResponse(content=orm_to_dict(existing))
 
 @app.delete("/advertisement/{advertisement_id}", status_code=204)
 async def delete_advertisement(advertisement_id: UUID = Path(..., description="ID объявления"), session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(AdvertisementORM).where(AdvertisementORM.id == advertisement_id))
-    ad_obj = result.scalar_one_or_none()
-    if ad_obj is None:
+    stmt = (
+        delete(AdvertisementORM)
+        .where(AdvertisementORM.id == str(advertisement_id))
+        .returning(AdvertisementORM.id)
+    )
+    deleted_id = (await session.execute(stmt)).scalar_one_or_none()
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Advertisement not found")
-    await session.delete(ad_obj)
     await session.commit()
+    await redis.delete(ad_key(advertisement_id))
+    await invalidate_search()
     return
 
 @app.get("/advertisement", response_model=List[Advertisement])
@@ -112,24 +185,58 @@ async def search_advertisements(
     min_price: Optional[float] = Query(None, ge=0),
     max_price: Optional[float] = Query(None, ge=0),
     author: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Значение заголовка X-Next-Cursor предыдущей страницы"),
     session: AsyncSession = Depends(get_session)
 ):
-    stmt = select(AdvertisementORM)
-    ads = (await session.execute(stmt)).scalars().all()
+    after = decode_cursor(cursor) if cursor is not None else None
+
+    cache_key = await search_key(
+        q=q,
+        min_price=min_price,
+        max_price=max_price,
+        author=author,
+        limit=limit,
+        cursor=cursor,
+    )
+    next_key = f"{cache_key}:next"
+    cached, cached_next = await redis.mget(cache_key, next_key)
+    if cached is not None and cached_next is not None:
+        return search_response(cached, cached_next.decode())
 
-    results = ads
+    stmt = select(AdvertisementORM)
 
     if q:
-        q_lower = q.lower()
-        results = [
-            a for a in results
-            if q_lower in a.title.lower() or q_lower in a.description.lower()
-        ]
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        stmt = stmt.where(
+            or_(
+                AdvertisementORM.title.ilike(pattern, escape="\\"),
+                AdvertisementORM.description.ilike(pattern, escape="\\"),
+            )
+        )
     if min_price is not None:
-        results = [a for a in results if a.price >= min_price]
+        stmt = stmt.where(AdvertisementORM.price >= min_price)
     if max_price is not None:
-        results = [a for a in results if a.price <= max_price]
+        stmt = stmt.where(AdvertisementORM.price <= max_price)
     if author is not None:
-        results = [a for a in results if a.author == author]
-
-    return [orm_to_pydantic(a) for a in results]
\ No newline at end of file
+        stmt = stmt.where(AdvertisementORM.author == author)
+    if after is not None:
+        after_created_at, after_id = after
+        stmt = stmt.where(
+            tuple_(AdvertisementORM.created_at, AdvertisementORM.id)
+            < tuple_(
+                literal(after_created_at, AdvertisementORM.created_at.type),
+                literal(after_id, AdvertisementORM.id.type),
+            )
+        )
+
+    stmt = stmt.order_by(AdvertisementORM.created_at.desc(), AdvertisementORM.id.desc()).limit(limit)
+    ads = (await session.execute(stmt)).scalars().all()
+    body = orjson.dumps([orm_to_dict(a) for a in ads])
+    next_cursor = encode_cursor(ads[-1]) if len(ads) == limit else ""
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.set(cache_key, body, ex=SEARCH_CACHE_TTL)
+        pipe.set(next_key, next_cursor, ex=SEARCH_CACHE_TTL)
+        await pipe.execute()
+    return search_response(body, next_cursor)
\ No newline at end of file
@@ -1,13 +1,14 @@
 import os
 import datetime
+from uuid import uuid4
 
 from dotenv import load_dotenv
 
-from sqlalchemy import String, DateTime, Column, Float
+from sqlalchemy import String, DateTime, Column, Float, Index
 from sqlalchemy.ext.asyncio import AsyncAttrs, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, MappedColumn, mapped_column, Mapped
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
-from sqlalchemy import func
+from sqlalchemy import event, text
 
 load_dotenv()
 
@@ -17,6 +18,18 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT")
 
+# Every uvicorn worker has its own pool, so the per-worker share of
+# POSTGRES_CONNECTION_BUDGET keeps workers * (pool + overflow) under
+# Postgres max_connections (100 by default).
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+POSTGRES_CONNECTION_BUDGET = int(os.getenv("POSTGRES_CONNECTION_BUDGET", "80"))
+_worker_connections = max(2, POSTGRES_CONNECTION_BUDGET // WEB_CONCURRENCY)
+POSTGRES_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", _worker_connections // 5))
+POSTGRES_POOL_SIZE = int(os.getenv(
+    "POSTGRES_POOL_SIZE",
+    min(32, (os.cpu_count() or 1) * 4, _worker_connections - POSTGRES_MAX_OVERFLOW),
+))
+
 POSTGRES_DSN = (
     f"postgresql+asyncpg://"
     f"{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
@@ -24,25 +37,71 @@ POSTGRES_DSN = (
     f"{POSTGRES_DB}"
 )
 
-engine = create_async_engine(POSTGRES_DSN)
-AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+engine = create_async_engine(
+    POSTGRES_DSN,
+    pool_size=POSTGRES_POOL_SIZE,
+    max_overflow=POSTGRES_MAX_OVERFLOW,
+    pool_recycle=1800,
+    pool_pre_ping=False,
+    query_cache_size=1200,
+    connect_args={"prepared_statement_cache_size": 256},
+)
+
+@event.listens_for(engine.sync_engine, "connect")
+def register_uuid_codec(dbapi_connection, connection_record):
+    # Decode uuid columns straight to str so neither asyncpg nor SQLAlchemy
+    # allocates a UUID object per returned row.
+    dbapi_connection.run_async(
+        lambda conn: conn.set_type_codec(
+            "uuid", encoder=str, decoder=str, schema="pg_catalog", format="text"
+        )
+    )
+
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
 
 class Base(AsyncAttrs, DeclarativeBase):
     pass
 
 class AdvertisementORM(Base):
     __tablename__ = "advertisement"
+    __table_args__ = (
+        Index("ix_advertisement_created_at_id", "created_at", "id"),
+    )
 
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=None)
+    id = Column(PGUUID(as_uuid=False), primary_key=True, index=True, default=lambda: str(uuid4()))
     title : MappedColumn[str] = mapped_column(String)
     description : MappedColumn[str] = mapped_column(String)
-    price : MappedColumn[float] = mapped_column(Float)
-    author : MappedColumn[str] = mapped_column(String)
-    created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    price : MappedColumn[float] = mapped_column(Float, index=True)
+    author : MappedColumn[str] = mapped_column(String, index=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.datetime.now(datetime.timezone.utc),
+    )
 
 async def init_db():
     async with engine.begin() as conn:
+        # Every uvicorn worker runs this on startup; serialize the DDL.
+        await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('init_db'))"))
         await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_advertisement_price ON advertisement (price)"
+        ))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_advertisement_author ON advertisement (author)"
+        ))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_advertisement_created_at_id "
+            "ON advertisement (created_at, id)"
+        ))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ad_title_trgm "
+            "ON advertisement USING GIN (title gin_trgm_ops)"
+        ))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ad_description_trgm "
+            "ON advertisement USING GIN (description gin_trgm_ops)"
+        ))
 
 async def close_db():
     await engine.dispose()
\ No newline at end of file